@@ -1,38 +1,47 @@
+import io
+import os
 import re
 import json
+import hashlib
 import asyncio
 import logging
-from typing import Dict, List, Optional, Tuple, Generator, Any
-from dataclasses import dataclass, asdict
+import functools
+from typing import Dict, List, Optional, Tuple, Callable, Generator, Iterator, AsyncGenerator, AsyncIterator, Any
+from dataclasses import dataclass, field, asdict
 from pathlib import Path
+from types import MappingProxyType
+from string import Template
 import time
-import gradio as gr
-import modelscope_studio.components.antd as antd
-import modelscope_studio.components.base as ms
-import modelscope_studio.components.pro as pro
-from openai import OpenAI
-from config import API_KEY, MODEL, SYSTEM_PROMPT, ENDPOINT, EXAMPLES, DEFAULT_LOCALE, DEFAULT_THEME
+import random
+import threading
+from collections import OrderedDict, defaultdict, deque
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from config import API_KEY, MODEL, SYSTEM_PROMPT, ENDPOINT, EXAMPLES, DEFAULT_LOCALE, DEFAULT_THEME, MAX_HISTORY_TURNS
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
+@dataclass(slots=True)
 class AppState:
     system_prompt: str = ""
-    history: List[Dict[str, str]] = None
+    history: List[Dict[str, str]] = field(default_factory=list)
     current_session_id: str = ""
-    user_preferences: Dict[str, Any] = None
+    user_preferences: Dict[str, Any] = field(default_factory=lambda: {
+        "theme": "light",
+        "code_format": "auto",
+        "auto_save": True,
+        "show_advanced": False
+    })
     
-    def __post_init__(self):
-        self.history = self.history or []
-        self.user_preferences = self.user_preferences or {
-            "theme": "light",
-            "code_format": "auto",
-            "auto_save": True,
-            "show_advanced": False
-        }
+    def append_turn(self, user_content: str, assistant_content: str, max_turns: int = MAX_HISTORY_TURNS):
+        self.history.append({'role': "user", 'content': user_content})
+        self.history.append({'role': "assistant", 'content': assistant_content})
+        excess = len(self.history) - max_turns * 2
+        if excess > 0:
+            del self.history[:excess]
 
-@dataclass
+@dataclass(slots=True)
 class GeneratedFiles:
     html: Optional[str] = None
     jsx: Optional[str] = None
@@ -41,9 +50,16 @@ class GeneratedFiles:
     js: Optional[str] = None
 
 class OpenAIClient:
-    def __init__(self, api_key: str, base_url: str, max_retries: int = 3):
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
+    def __init__(self, api_key: str, base_url: str, max_retries: int = 3, request_timeout: float = 30.0, read_timeout: float = 120.0):
+        timeout = httpx.Timeout(read_timeout, connect=5.0)
+        self.client = OpenAI(api_key=api_key, base_url=base_url, timeout=timeout)
+        self.async_client = AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout)
         self.max_retries = max_retries
+        self.request_timeout = request_timeout
+    
+    @staticmethod
+    def _backoff_delay(attempt: int) -> float:
+        return 2 ** attempt + random.random() * 0.25
     
     def create_completion(self, messages: List[Dict], model: str) -> Generator:
         for attempt in range(self.max_retries):
@@ -59,11 +75,60 @@ class OpenAIClient:
                 logger.error(f"Attempt {attempt + 1} failed: {str(e)}")
                 if attempt == self.max_retries - 1:
                     raise
-                time.sleep(2 ** attempt)
+                time.sleep(self._backoff_delay(attempt))
+    
+    async def acreate_completion(self, messages: List[Dict], model: str) -> AsyncIterator:
+        for attempt in range(self.max_retries):
+            try:
+                return await asyncio.wait_for(
+                    self.async_client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        stream=True,
+                        temperature=0.7,
+                        max_tokens=4000
+                    ),
+                    timeout=self.request_timeout
+                )
+            except Exception as e:
+                logger.error(f"Attempt {attempt + 1} failed: {str(e)}")
+                if attempt == self.max_retries - 1:
+                    raise
+                await asyncio.sleep(self._backoff_delay(attempt))
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+    
+    @staticmethod
+    def make_key(messages: List[Dict], model: str) -> str:
+        payload = json.dumps([model, messages], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        response = self._entries.get(key)
+        if response is not None:
+            self._entries.move_to_end(key)
+        return response
+    
+    def put(self, key: str, response: str):
+        self._entries[key] = response
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
 
 client = OpenAIClient(API_KEY, ENDPOINT)
+response_cache = ResponseCache()
+
+STREAM_FLUSH_INTERVAL = 0.05
+STREAM_MIN_BATCH = 1
+STREAM_MAX_BATCH = 64
+STREAM_BATCH_GROWTH = 3
+CACHE_REPLAY_CHUNK = 64
+GENERATION_CONCURRENCY_LIMIT = 16
 
-REACT_IMPORTS = {
+REACT_IMPORTS = MappingProxyType({
     "react": "https://esm.sh/react@^19.0.0",
     "react/": "https://esm.sh/react@^19.0.0/",
     "react-dom": "https://esm.sh/react-dom@^19.0.0",
@@ -85,141 +150,238 @@ REACT_IMPORTS = {
     "lodash": "https://esm.sh/lodash@4.17.21",
     "dayjs": "https://esm.sh/dayjs@1.11.13",
     "uuid": "https://esm.sh/uuid@10.0.0"
-}
+})
+
+_INDEX_TSX = """import Demo from './demo.tsx'
+import "@tailwindcss/browser"
+export default Demo"""
+_REACT_SANDBOX_BASE = {"template": "react", "imports": dict(REACT_IMPORTS)}
+_HTML_SANDBOX_BASE = {"template": "html", "imports": {}}
+
+_TOUR_STEPS = (
+    ("🎯 Step 1: Describe", "Tell the AI what kind of web application you want to create. Be as detailed as possible!"),
+    ("🎨 Step 2: Generate", "Click the Generate button and watch the magic happen!"),
+    ("👀 Step 3: Preview", "See your application come to life in real-time."),
+    ("⬇️ Step 4: Download", "Download your code and use it anywhere!"),
+)
+
+_EXAMPLE_VIEW = tuple(
+    (example, example['description'][:100] + "..." if len(example['description']) > 100 else example['description'])
+    for example in EXAMPLES[:3]
+)
+
+_FENCE_LANG_ALIASES = {'javascript': 'js'}
+_FENCE_LANGS = frozenset(('html', 'jsx', 'tsx', 'css', 'js'))
+_PRIMARY_FILE_PRIORITY = ('tsx', 'jsx', 'html', 'js')
+_DOWNLOAD_BASENAMES = {'tsx': 'App', 'jsx': 'App', 'html': 'index', 'js': 'script'}
+_HTML_TAG_PATTERN = re.compile(r'<html', re.IGNORECASE)
+
+def _scan_fences(text: str) -> Iterator[Tuple[str, str]]:
+    pos = 0
+    while True:
+        start = text.find('```', pos)
+        if start == -1:
+            return
+        newline = text.find('\n', start + 3)
+        if newline == -1:
+            return
+        lang = text[start + 3:newline].lower()
+        lang = _FENCE_LANG_ALIASES.get(lang, lang)
+        if lang not in _FENCE_LANGS:
+            pos = start + 1
+            continue
+        end = text.find('\n```', newline + 2)
+        if end == -1:
+            return
+        yield lang, text[newline + 1:end]
+        pos = end + 4
 
 class CodeParser:
     @staticmethod
     def extract_files(text: str) -> GeneratedFiles:
-        patterns = {
-            'html': r'```html\n(.+?)\n```',
-            'jsx': r'```jsx\n(.+?)\n```',
-            'tsx': r'```tsx\n(.+?)\n```',
-            'css': r'```css\n(.+?)\n```',
-            'js': r'```(?:javascript|js)\n(.+?)\n```',
-        }
+        buckets = defaultdict(list)
+        for file_type, body in _scan_fences(text):
+            buckets[file_type].append(body)
         
         files = GeneratedFiles()
-        for file_type, pattern in patterns.items():
-            matches = re.findall(pattern, text, re.DOTALL | re.IGNORECASE)
-            if matches:
-                content = '\n'.join(matches).strip()
-                setattr(files, file_type, content)
+        for file_type, bodies in buckets.items():
+            setattr(files, file_type, '\n'.join(bodies).strip())
         
-        if not any([files.html, files.jsx, files.tsx]):
+        if not (files.html or files.jsx or files.tsx):
             files.html = text.strip()
         return files
     
     @staticmethod
     def get_primary_file(files: GeneratedFiles) -> Tuple[str, str]:
-        if files.tsx:
-            return files.tsx, "tsx"
-        elif files.jsx:
-            return files.jsx, "jsx"
-        elif files.html:
-            return files.html, "html"
-        elif files.js:
-            return files.js, "js"
+        for file_type in _PRIMARY_FILE_PRIORITY:
+            content = getattr(files, file_type)
+            if content:
+                return content, file_type
         return "", "html"
 
+class StreamingCodeParser:
+    def __init__(self):
+        self._raw = io.StringIO()
+    
+    def feed(self, delta: str):
+        self._raw.write(delta)
+    
+    def getvalue(self) -> str:
+        return self._raw.getvalue()
+    
+    def finalize(self) -> GeneratedFiles:
+        return CodeParser.extract_files(self._raw.getvalue())
+
+_DUPLICATE_REPLY_MARKER = "(Same code as an earlier reply in this conversation.)"
+
+def _dedupe_messages(messages: List[Dict]) -> List[Dict]:
+    seen = set()
+    deduped = []
+    for message in messages:
+        if message.get('role') == 'assistant':
+            digest = hashlib.blake2b(str(message.get('content')).encode("utf-8"), digest_size=16).digest()
+            if digest in seen:
+                message = {**message, 'content': _DUPLICATE_REPLY_MARKER}
+            else:
+                seen.add(digest)
+        deduped.append(message)
+    return deduped
+
+def _ignore_progress(*args, **kwargs):
+    pass
+
+async def _completion_deltas(messages: List[Dict]) -> AsyncIterator[Tuple[Optional[str], bool]]:
+    stream = await client.acreate_completion(messages, MODEL)
+    async for chunk in stream:
+        choice = chunk.choices[0]
+        yield choice.delta.content, choice.finish_reason == 'stop'
+
+async def _replay_deltas(response: str) -> AsyncIterator[Tuple[Optional[str], bool]]:
+    for start in range(0, len(response), CACHE_REPLAY_CHUNK):
+        yield response[start:start + CACHE_REPLAY_CHUNK], False
+        await asyncio.sleep(0)
+    yield None, True
+
 class EnhancedGradioEvents:
     @staticmethod
-    def generate_code(input_value: str, system_prompt_input_value: str, state_value: Dict, progress=gr.Progress()):
+    async def generate_code(input_value: str, system_prompt_input_value: str, state_value: AppState, progress: Optional[Callable] = None) -> AsyncGenerator[Dict, None]:
+        import gradio as gr
+        progress = progress or _ignore_progress
         if not input_value or not input_value.strip():
             yield {
-                output_loading: gr.update(spinning=False),
-                state_tab: gr.update(active_key="empty"),
-                notification: gr.update(value="Please enter a description first", visible=True)
+                "output_loading": gr.update(spinning=False),
+                "state_tab": gr.update(active_key="empty"),
+                "notification": gr.update(value="Please enter a description first", visible=True)
             }
             return
         
         yield {
-            output_loading: gr.update(spinning=True),
-            state_tab: gr.update(active_key="loading"),
-            output: gr.update(value=""),
-            notification: gr.update(visible=False)
+            "output_loading": gr.update(spinning=True),
+            "state_tab": gr.update(active_key="loading"),
+            "output": gr.update(value=""),
+            "notification": gr.update(visible=False)
         }
         
         try:
-            messages = [{'role': "system", 'content': SYSTEM_PROMPT}] + state_value.get("history", [])
+            messages = _dedupe_messages([{'role': "system", 'content': SYSTEM_PROMPT}] + state_value.history)
             messages.append({'role': "user", 'content': input_value})
             
             progress(0.1, "Connecting to AI model...")
-            generator = client.create_completion(messages, MODEL)
+            cache_key = ResponseCache.make_key(messages, MODEL)
+            cached_response = response_cache.get(cache_key)
+            if cached_response is not None:
+                deltas = _replay_deltas(cached_response)
+            else:
+                deltas = _completion_deltas(messages)
             
-            response = ""
+            parser = StreamingCodeParser()
             progress(0.3, "Generating code...")
             
-            for chunk in generator:
-                if chunk.choices[0].delta.content:
-                    response += chunk.choices[0].delta.content
-                    yield {
-                        output: gr.update(value=response),
-                        output_loading: gr.update(spinning=True),
-                    }
+            last_flush = time.monotonic()
+            pending_chars = 0
+            batch_size = STREAM_MIN_BATCH
+            
+            async for content, finished in deltas:
+                if content:
+                    parser.feed(content)
+                    pending_chars += len(content)
+                    now = time.monotonic()
+                    if pending_chars >= batch_size or now - last_flush >= STREAM_FLUSH_INTERVAL:
+                        yield {
+                            "output": gr.update(value=parser.getvalue()),
+                            "output_loading": gr.update(spinning=True),
+                        }
+                        last_flush = now
+                        pending_chars = 0
+                        batch_size = min(batch_size * STREAM_BATCH_GROWTH, STREAM_MAX_BATCH)
                 
-                if chunk.choices[0].finish_reason == 'stop':
+                if finished:
                     progress(0.8, "Processing generated code...")
-                    state_value["history"] = messages + [{'role': "assistant", 'content': response}]
-                    files = CodeParser.extract_files(response)
+                    response = parser.getvalue()
+                    if cached_response is None:
+                        response_cache.put(cache_key, response)
+                    state_value.append_turn(input_value, response)
+                    files = parser.finalize()
                     primary_content, file_type = CodeParser.get_primary_file(files)
                     
                     progress(0.9, "Preparing preview...")
-                    is_react = file_type in ["tsx", "jsx"]
-                    sandbox_config = {
-                        "template": "react" if is_react else "html",
-                        "imports": REACT_IMPORTS if is_react else {}
-                    }
-                    
-                    if is_react:
-                        sandbox_config["value"] = {
-                            "./index.tsx": """import Demo from './demo.tsx'
-import "@tailwindcss/browser"
-export default Demo""",
-                            "./demo.tsx": primary_content
-                        }
+                    if file_type in ("tsx", "jsx"):
+                        sandbox_config = dict(_REACT_SANDBOX_BASE)
+                        sandbox_config["value"] = {"./index.tsx": _INDEX_TSX, "./demo.tsx": primary_content}
                     else:
+                        sandbox_config = dict(_HTML_SANDBOX_BASE)
                         sandbox_config["value"] = {"./index.html": primary_content}
                     
                     progress(1.0, "Complete!")
                     yield {
-                        output: gr.update(value=response),
-                        download_content: gr.update(value=primary_content),
-                        state_tab: gr.update(active_key="render"),
-                        output_loading: gr.update(spinning=False),
-                        sandbox: gr.update(**sandbox_config),
-                        state: gr.update(value=state_value),
-                        download_btn: gr.update(disabled=False),
-                        notification: gr.update(value="✅ Code generated successfully!", visible=True)
+                        "output": gr.update(value=response),
+                        "download_content": gr.update(value=primary_content),
+                        "download_meta": gr.update(value=json.dumps({
+                            "ext": file_type,
+                            "name": _DOWNLOAD_BASENAMES.get(file_type, "generated_code")
+                        })),
+                        "state_tab": gr.update(active_key="render"),
+                        "output_loading": gr.update(spinning=False),
+                        "sandbox": gr.update(**sandbox_config),
+                        "state": gr.update(value=state_value),
+                        "download_btn": gr.update(disabled=False),
+                        "notification": gr.update(value="✅ Code generated successfully!", visible=True)
                     }
                     return
+            
+            if pending_chars:
+                yield {
+                    "output": gr.update(value=parser.getvalue()),
+                    "output_loading": gr.update(spinning=True),
+                }
                     
         except Exception as e:
             logger.error(f"Code generation failed: {str(e)}")
             yield {
-                output: gr.update(value=f"❌ **Error**: {str(e)}"),
-                output_loading: gr.update(spinning=False),
-                state_tab: gr.update(active_key="render"),
-                notification: gr.update(value=f"❌ Generation failed: {str(e)}", visible=True)
+                "output": gr.update(value=f"❌ **Error**: {str(e)}"),
+                "output_loading": gr.update(spinning=False),
+                "state_tab": gr.update(active_key="render"),
+                "notification": gr.update(value=f"❌ Generation failed: {str(e)}", visible=True)
             }
     
     @staticmethod
     def select_example(example: Dict):
-        def _handler():
-            return {
-                input: gr.update(value=example["description"]),
-                notification: gr.update(value=f"📝 Loaded example: {example['title']}", visible=True)
-            }
-        return _handler
+        import gradio as gr
+        return (
+            gr.update(value=example["description"]),
+            gr.update(value=f"📝 Loaded example: {example['title']}", visible=True)
+        )
     
     @staticmethod
     def export_code(content: str, file_format: str = "auto"):
+        import gradio as gr
         if not content:
             return gr.update(value="No content to export")
         
         if file_format == "auto":
             if "import React" in content or "export default" in content:
                 extension = "tsx"
-            elif "<html" in content.lower():
+            elif _HTML_TAG_PATTERN.search(content):
                 extension = "html"
             else:
                 extension = "txt"
@@ -233,20 +395,23 @@ export default Demo""",
     
     @staticmethod
     def toggle_advanced_settings(current_state: bool):
+        import gradio as gr
         return gr.update(visible=not current_state)
     
     @staticmethod
-    def save_user_preferences(preferences: Dict, state_value: Dict):
-        state_value["user_preferences"] = preferences
+    def save_user_preferences(preferences: Dict, state_value: AppState):
+        import gradio as gr
+        state_value.user_preferences = preferences
         return gr.update(value=state_value)
     
     @staticmethod
-    def clear_history_with_confirmation(state_value: Dict):
-        state_value["history"] = []
-        return {
-            state: gr.update(value=state_value),
-            notification: gr.update(value="🧹 Chat history cleared", visible=True)
-        }
+    def clear_history_with_confirmation(state_value: AppState):
+        import gradio as gr
+        state_value.history = []
+        return (
+            gr.update(value=state_value),
+            gr.update(value="🧹 Chat history cleared", visible=True)
+        )
     
     @staticmethod
     def format_code(code: str, language: str = "auto"):
@@ -375,8 +540,26 @@ ENHANCED_CSS = """
 }
 """
 
+NOTIFICATION_BOOTSTRAP_JS = """() => {
+    const refresh = () => {
+        if (!window.__notifEl || !window.__notifEl.isConnected) {
+            window.__notifEl = document.querySelector('.notification');
+        }
+    };
+    refresh();
+    new MutationObserver(refresh).observe(document.body, { childList: true, subtree: true });
+}"""
+
 def create_enhanced_app():
-    with gr.Blocks(css=ENHANCED_CSS, title="🚀 AI Web Dev Assistant Pro") as demo:
+    import gradio as gr
+    import modelscope_studio.components.antd as antd
+    import modelscope_studio.components.base as ms
+    import modelscope_studio.components.pro as pro
+    
+    open_update = gr.update(open=True)
+    close_update = gr.update(open=False)
+    
+    with gr.Blocks(css=ENHANCED_CSS, js=NOTIFICATION_BOOTSTRAP_JS, title="🚀 AI Web Dev Assistant Pro") as demo:
         state = gr.State(AppState())
         notification = gr.HTML(visible=False, elem_classes="notification")
         
@@ -453,7 +636,7 @@ def create_enhanced_app():
                                 
                                 with antd.Card(title="🎯 Quick Examples", elem_classes="examples-card"):
                                     with antd.Space(direction="vertical", size="middle", elem_style=dict(width="100%")):
-                                        for example in EXAMPLES[:3]:
+                                        for example, summary in _EXAMPLE_VIEW:
                                             with antd.Card(
                                                 size="small",
                                                 hoverable=True,
@@ -461,11 +644,12 @@ def create_enhanced_app():
                                             ) as example_card:
                                                 antd.Card.Meta(
                                                     title=f"💡 {example['title']}",
-                                                    description=example['description'][:100] + "..." if len(example['description']) > 100 else example['description']
+                                                    description=summary
                                                 )
                                             example_card.click(
-                                                fn=EnhancedGradioEvents.select_example(example),
-                                                outputs=[input, notification]
+                                                fn=functools.partial(EnhancedGradioEvents.select_example, example),
+                                                outputs=[input, notification],
+                                                show_progress=False
                                             )
                                 
                                 with antd.Card(title="⚙️ Controls", elem_classes="controls-card"):
@@ -495,6 +679,7 @@ def create_enhanced_app():
                                         sandbox = pro.WebSandbox(height="600px", elem_classes="output-sandbox")
                 
                 download_content = gr.Text(visible=False)
+                download_meta = gr.Text(visible=False)
                 system_prompt_input = gr.Text(SYSTEM_PROMPT, visible=False)
                 
                 with antd.Drawer(title="📋 Generated Code", width="60%", placement="right") as code_drawer:
@@ -505,65 +690,120 @@ def create_enhanced_app():
                     history_output = gr.Chatbot(show_label=False, type="messages", height='60vh', elem_style=dict(borderRadius="12px", overflow="hidden"))
                 
                 with antd.Tour() as usage_tour:
-                    antd.Tour.Step(title="🎯 Step 1: Describe", description="Tell the AI what kind of web application you want to create. Be as detailed as possible!")
-                    antd.Tour.Step(title="🎨 Step 2: Generate", description="Click the Generate button and watch the magic happen!")
-                    antd.Tour.Step(title="👀 Step 3: Preview", description="See your application come to life in real-time.")
-                    antd.Tour.Step(title="⬇️ Step 4: Download", description="Download your code and use it anywhere!")
+                    for title, description in _TOUR_STEPS:
+                        antd.Tour.Step(title=title, description=description)
+        
+        generation_outputs = {
+            "output": output,
+            "state_tab": state_tab,
+            "sandbox": sandbox,
+            "download_content": download_content,
+            "download_meta": download_meta,
+            "output_loading": output_loading,
+            "state": state,
+            "download_btn": download_btn,
+            "notification": notification
+        }
+        
+        async def submit_flow(input_value: str, system_prompt_input_value: str, state_value: AppState, progress=gr.Progress()):
+            drawer_opened = False
+            async for update in EnhancedGradioEvents.generate_code(input_value, system_prompt_input_value, state_value, progress):
+                update = {generation_outputs[name]: value for name, value in update.items()}
+                if not drawer_opened:
+                    update[code_drawer] = open_update
+                    drawer_opened = True
+                yield update
+            yield {code_drawer: close_update}
         
         def close_modal_handler():
-            return gr.update(open=False)
+            return close_update
         
-        def open_modal_handler(component):
-            return gr.update(open=True)
+        def open_modal_handler():
+            return open_update
         
-        tour_btn.click(fn=lambda: gr.update(open=True), outputs=[usage_tour])
-        usage_tour.close(fn=close_modal_handler, outputs=[usage_tour])
-        usage_tour.finish(fn=close_modal_handler, outputs=[usage_tour])
+        tour_btn.click(fn=open_modal_handler, outputs=[usage_tour], show_progress=False)
+        usage_tour.close(fn=close_modal_handler, outputs=[usage_tour], show_progress=False)
+        usage_tour.finish(fn=close_modal_handler, outputs=[usage_tour], show_progress=False)
         
-        submit_btn.click(fn=lambda: gr.update(open=True), outputs=[code_drawer]).then(
-            fn=EnhancedGradioEvents.generate_code,
+        submit_btn.click(
+            fn=submit_flow,
             inputs=[input, system_prompt_input, state],
-            outputs=[output, state_tab, sandbox, download_content, output_loading, state, download_btn, notification]
-        ).then(fn=close_modal_handler, outputs=[code_drawer])
+            outputs=[code_drawer, *generation_outputs.values()],
+            concurrency_limit=GENERATION_CONCURRENCY_LIMIT,
+            concurrency_id="generation"
+        )
         
-        view_code_btn.click(fn=lambda: gr.update(open=True), outputs=[code_drawer])
-        code_drawer.close(fn=close_modal_handler, outputs=[code_drawer])
+        view_code_btn.click(fn=open_modal_handler, outputs=[code_drawer], show_progress=False)
+        code_drawer.close(fn=close_modal_handler, outputs=[code_drawer], show_progress=False)
         
-        history_btn.click(fn=lambda: gr.update(open=True), outputs=[history_drawer])
-        history_drawer.close(fn=close_modal_handler, outputs=[history_drawer])
+        history_btn.click(fn=open_modal_handler, outputs=[history_drawer], show_progress=False)
+        history_drawer.close(fn=close_modal_handler, outputs=[history_drawer], show_progress=False)
         
-        clear_history_btn.click(fn=EnhancedGradioEvents.clear_history_with_confirmation, inputs=[state], outputs=[state, notification])
+        clear_history_btn.click(fn=EnhancedGradioEvents.clear_history_with_confirmation, inputs=[state], outputs=[state, notification], show_progress=False)
         
         download_btn.click(
             fn=None,
-            inputs=[download_content],
-            js="""(content) => {
+            inputs=[download_content, download_meta],
+            js="""async (content, meta) => {
                 if (!content) {
                     alert('No content to download!');
                     return;
                 }
-                let extension = 'txt';
-                let filename = 'generated_code';
-                if (content.includes('import React') || content.includes('export default')) {
-                    extension = 'tsx';
-                    filename = 'App';
-                } else if (content.includes('<html') || content.includes('<!DOCTYPE')) {
-                    extension = 'html';
-                    filename = 'index';
-                } else if (content.includes('function') || content.includes('const ')) {
-                    extension = 'js';
-                    filename = 'script';
+                const { ext = 'txt', name: basename = 'generated_code' } = meta ? JSON.parse(meta) : {};
+                const name = `${basename}.${ext}`;
+                const sliceEnd = (text, start, size) => {
+                    let end = Math.min(start + size, text.length);
+                    const last = text.charCodeAt(end - 1);
+                    if (end < text.length && last >= 0xD800 && last <= 0xDBFF) end -= 1;
+                    return end;
+                };
+                const save = (href) => {
+                    const a = document.createElement('a');
+                    a.href = href;
+                    a.download = name;
+                    document.body.appendChild(a);
+                    a.click();
+                    document.body.removeChild(a);
+                };
+                let saved = false;
+                if (content.length < 65536) {
+                    save('data:text/plain;charset=utf-8,' + encodeURIComponent(content));
+                    saved = true;
+                } else if (content.length >= 4 * 1024 * 1024 && window.showSaveFilePicker) {
+                    try {
+                        const handle = await window.showSaveFilePicker({ suggestedName: name });
+                        const writable = await handle.createWritable();
+                        for (let start = 0, end; start < content.length; start = end) {
+                            end = sliceEnd(content, start, 1 << 20);
+                            await writable.write(content.slice(start, end));
+                        }
+                        await writable.close();
+                        saved = true;
+                    } catch (err) {
+                        if (err.name === 'AbortError') return;
+                    }
+                }
+                if (!saved) {
+                    const CHUNK = 65536;
+                    const encoder = new TextEncoder();
+                    let offset = 0;
+                    const stream = new ReadableStream({
+                        pull(controller) {
+                            if (offset >= content.length) {
+                                controller.close();
+                                return;
+                            }
+                            const end = sliceEnd(content, offset, CHUNK);
+                            controller.enqueue(encoder.encode(content.slice(offset, end)));
+                            offset = end;
+                        }
+                    });
+                    const blob = await new Response(stream, { headers: { 'Content-Type': 'text/plain;charset=utf-8' } }).blob();
+                    const url = URL.createObjectURL(blob);
+                    save(url);
+                    URL.revokeObjectURL(url);
                 }
-                const blob = new Blob([content], { type: 'text/plain' });
-                const url = URL.createObjectURL(blob);
-                const a = document.createElement('a');
-                a.href = url;
-                a.download = `${filename}.${extension}`;
-                document.body.appendChild(a);
-                a.click();
-                document.body.removeChild(a);
-                URL.revokeObjectURL(url);
-                const notification = document.querySelector('.notification');
+                const notification = window.__notifEl;
                 if (notification) {
                     notification.innerHTML = '✅ File downloaded successfully!';
                     notification.style.display = 'block';
@@ -572,13 +812,13 @@ def create_enhanced_app():
             }"""
         )
         
-        notification.change(fn=None, js="""() => { setTimeout(() => { const notificationEl = document.querySelector('.notification'); if (notificationEl) { notificationEl.style.display = 'none'; } }, 5000); }""")
+        notification.change(fn=None, js="""() => { clearTimeout(window.__notifTimer); window.__notifTimer = setTimeout(() => { if (window.__notifEl) { window.__notifEl.style.display = 'none'; } }, 5000); }""")
         
     return demo
 
 class TemplateManager:
     TEMPLATES = {
-        "react_dashboard": """import React, { useState } from 'react';
+        "react_dashboard": Template("""import React, { useState } from 'react';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts';
 const Dashboard = () => {
   const [data] = useState([
@@ -590,7 +830,7 @@ const Dashboard = () => {
   return (
     <div className="min-h-screen bg-gradient-to-br from-blue-50 to-indigo-100 p-6">
       <div className="max-w-7xl mx-auto">
-        <h1 className="text-4xl font-bold text-gray-800 mb-8">Dashboard</h1>
+        <h1 className="text-4xl font-bold text-gray-800 mb-8">${title}</h1>
         <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6 mb-8">
           <div className="bg-white rounded-xl shadow-lg p-6">
             <h3 className="text-lg font-semibold text-gray-700 mb-2">Total Users</h3>
@@ -598,7 +838,7 @@ const Dashboard = () => {
           </div>
           <div className="bg-white rounded-xl shadow-lg p-6">
             <h3 className="text-lg font-semibold text-gray-700 mb-2">Revenue</h3>
-            <p className="text-3xl font-bold text-green-600">$54,239</p>
+            <p className="text-3xl font-bold text-green-600">$$54,239</p>
           </div>
           <div className="bg-white rounded-xl shadow-lg p-6">
             <h3 className="text-lg font-semibold text-gray-700 mb-2">Orders</h3>
@@ -613,7 +853,7 @@ const Dashboard = () => {
               <XAxis dataKey="name" />
               <YAxis />
               <Tooltip />
-              <Bar dataKey="value" fill="#3b82f6" />
+              <Bar dataKey="value" fill="${accent_color}" />
             </BarChart>
           </ResponsiveContainer>
         </div>
@@ -621,23 +861,23 @@ const Dashboard = () => {
     </div>
   );
 };
-export default Dashboard;""",
-        "landing_page": """<!DOCTYPE html>
+export default Dashboard;"""),
+        "landing_page": Template("""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Modern Landing Page</title>
+    <title>${page_title}</title>
     <script src="https://cdn.tailwindcss.com"></script>
     <style>
-        .gradient-bg { background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); }
+        .gradient-bg { background: linear-gradient(135deg, ${gradient_start} 0%, ${gradient_end} 100%); }
         .glass { background: rgba(255, 255, 255, 0.1); backdrop-filter: blur(10px); }
     </style>
 </head>
 <body class="gradient-bg min-h-screen">
     <div class="container mx-auto px-6 py-20">
         <div class="text-center text-white">
-            <h1 class="text-6xl font-bold mb-6 animate-fade-in">Build Amazing Things</h1>
+            <h1 class="text-6xl font-bold mb-6 animate-fade-in">${headline}</h1>
             <p class="text-xl mb-8 opacity-90">Create stunning web applications with our powerful tools</p>
             <button class="glass rounded-full px-8 py-4 text-lg font-semibold hover:scale-105 transition-transform">Get Started</button>
         </div>
@@ -660,64 +900,111 @@ export default Dashboard;""",
         </div>
     </div>
 </body>
-</html>"""
+</html>""")
     }
+    TEMPLATE_DEFAULTS = {
+        "react_dashboard": {"title": "Dashboard", "accent_color": "#3b82f6"},
+        "landing_page": {
+            "page_title": "Modern Landing Page",
+            "headline": "Build Amazing Things",
+            "gradient_start": "#667eea",
+            "gradient_end": "#764ba2"
+        }
+    }
+    _TEMPLATE_KEYS = tuple(TEMPLATES)
+    _DEFAULT_RENDERS = {}
+    for _name, _template in TEMPLATES.items():
+        _DEFAULT_RENDERS[_name] = _template.substitute(TEMPLATE_DEFAULTS[_name])
+    del _name, _template
     
     @classmethod
-    def get_template(cls, template_name: str) -> str:
-        return cls.TEMPLATES.get(template_name, "")
+    def get_template(cls, template_name: str, **values: str) -> str:
+        if not values:
+            return cls._DEFAULT_RENDERS.get(template_name, "")
+        template = cls.TEMPLATES.get(template_name)
+        if template is None:
+            return ""
+        return template.substitute({**cls.TEMPLATE_DEFAULTS[template_name], **values})
     
     @classmethod
-    def list_templates(cls) -> List[str]:
-        return list(cls.TEMPLATES.keys())
+    def list_templates(cls) -> Tuple[str, ...]:
+        return cls._TEMPLATE_KEYS
 
 class CodeQualityChecker:
+    _REACT_PATTERN = re.compile(
+        r'(?P<use_state>useState)|(?P<imports>import)|(?P<function>function)'
+        r'|(?P<default_export>export default)|(?P<class_name>className)|(?P<class_attr>class=)'
+    )
+    _HTML_PATTERN = re.compile(
+        r'(?P<doctype><!DOCTYPE html>)|(?P<html><html)|(?P<title><title>)|(?P<head><head>)|(?P<lang>lang=")'
+    )
+    
     @staticmethod
-    def check_react_best_practices(code: str) -> List[str]:
+    def _scan(pattern: re.Pattern, code: str) -> set:
+        found = set()
+        for match in pattern.finditer(code):
+            found.add(match.lastgroup)
+            if len(found) == len(pattern.groupindex):
+                break
+        return found
+    
+    @classmethod
+    def check_react_best_practices(cls, code: str) -> List[str]:
+        found = cls._scan(cls._REACT_PATTERN, code)
         issues = []
-        if "useState" in code and "import" not in code:
+        if "use_state" in found and "imports" not in found:
             issues.append("Consider importing React hooks explicitly")
-        if "function" in code and "export default" not in code:
+        if "function" in found and "default_export" not in found:
             issues.append("Component should have a default export")
-        if "className" not in code and "class=" in code:
+        if "class_name" not in found and "class_attr" in found:
             issues.append("Use className instead of class in React")
         return issues
     
-    @staticmethod
-    def check_html_structure(code: str) -> List[str]:
+    @classmethod
+    def check_html_structure(cls, code: str) -> List[str]:
+        found = cls._scan(cls._HTML_PATTERN, code)
         issues = []
-        if "<!DOCTYPE html>" not in code and "<html" in code:
+        if "doctype" not in found and "html" in found:
             issues.append("Missing DOCTYPE declaration")
-        if "<title>" not in code and "<head>" in code:
+        if "title" not in found and "head" in found:
             issues.append("Missing title tag")
-        if 'lang="' not in code and "<html" in code:
+        if "lang" not in found and "html" in found:
             issues.append("Missing lang attribute in html tag")
         return issues
 
 class PerformanceMonitor:
-    def __init__(self):
-        self.generation_times = []
+    def __init__(self, max_samples: int = 1024):
+        self.generation_times = deque(maxlen=max_samples)
+        self._time_sum = 0.0
         self.error_count = 0
         self.success_count = 0
+        self._lock = threading.Lock()
     
     def record_generation_time(self, duration: float):
-        self.generation_times.append(duration)
+        with self._lock:
+            if len(self.generation_times) == self.generation_times.maxlen:
+                self._time_sum -= self.generation_times[0]
+            self.generation_times.append(duration)
+            self._time_sum += duration
     
     def record_success(self):
-        self.success_count += 1
+        with self._lock:
+            self.success_count += 1
     
     def record_error(self):
-        self.error_count += 1
+        with self._lock:
+            self.error_count += 1
     
     def get_stats(self) -> Dict[str, Any]:
-        if not self.generation_times:
-            return {"avg_time": 0, "success_rate": 0, "total_generations": 0}
-        return {
-            "avg_time": sum(self.generation_times) / len(self.generation_times),
-            "success_rate": self.success_count / (self.success_count + self.error_count),
-            "total_generations": len(self.generation_times),
-            "error_count": self.error_count
-        }
+        with self._lock:
+            if not self.generation_times:
+                return {"avg_time": 0, "success_rate": 0, "total_generations": 0}
+            return {
+                "avg_time": self._time_sum / len(self.generation_times),
+                "success_rate": self.success_count / (self.success_count + self.error_count),
+                "total_generations": len(self.generation_times),
+                "error_count": self.error_count
+            }
 
 performance_monitor = PerformanceMonitor()
 
@@ -739,10 +1026,12 @@ class EnhancedConfig:
     }
     
     @classmethod
+    @functools.lru_cache(maxsize=32)
     def is_feature_enabled(cls, feature: str) -> bool:
         return cls.FEATURE_FLAGS.get(feature, False)
     
     @classmethod
+    @functools.lru_cache(maxsize=32)
     def get_theme(cls, theme_name: str) -> Dict:
         return cls.UI_THEMES.get(theme_name, cls.UI_THEMES["light"])
 
@@ -755,10 +1044,11 @@ def create_production_app():
     return app
 
 if __name__ == "__main__":
+    workers = max(4, (os.cpu_count() or 4) * 4)
     demo = create_production_app()
-    demo.queue(default_concurrency_limit=50, max_size=200, api_open=False).launch(
+    demo.queue(default_concurrency_limit=workers, max_size=workers * 4, api_open=False).launch(
         ssr_mode=False,
-        max_threads=50,
+        max_threads=workers,
         show_error=True,
         quiet=False,
         server_name="0.0.0.0",
@@ -6,6 +6,8 @@ MODEL = "qwen3-coder-plus"
 
 ENDPOINT = "https://dashscope.aliyuncs.com/compatible-mode/v1"
 
+MAX_HISTORY_TURNS = int(os.getenv('WEBDEV_MAX_HISTORY', '32'))
+
 SYSTEM_PROMPT = """You are an expert on frontend design, you will always respond to web design tasks.
 Your task is to create a website according to the user's request using either native HTML or React framework.
 When choosing implementation framework, you should follow these rules:
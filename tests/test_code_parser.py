@@ -0,0 +1,73 @@
+import re
+from dataclasses import asdict
+
+import pytest
+
+from app import CodeParser, GeneratedFiles, StreamingCodeParser
+
+REFERENCE_PATTERNS = {
+    'html': r'```html\n(.+?)\n```',
+    'jsx': r'```jsx\n(.+?)\n```',
+    'tsx': r'```tsx\n(.+?)\n```',
+    'css': r'```css\n(.+?)\n```',
+    'js': r'```(?:javascript|js)\n(.+?)\n```',
+}
+
+SAMPLES = [
+    "",
+    "plain text with no code",
+    "```html\n<p>x</p>\n```",
+    "Sure! ```html\n<p>x</p>\n```",
+    "```html \n<p>x</p>\n```",
+    "```html\r\n<p>x</p>\r\n```\r\n",
+    "```HTML\n<p>upper</p>\n```",
+    "```tsx\nexport default () => <div/>;\n```\n\n```css\nbody { margin: 0; }\n```",
+    "```jsx\nconst A = 1;\n```\ntext\n```jsx\nconst B = 2;\n```",
+    "```javascript\nconsole.log(1);\n```\n```js\nconsole.log(2);\n```",
+    "```python\nprint(1)\n```\n```html\n<b>after</b>\n```",
+    "```html\n<p>unterminated",
+    "```html\n\n```",
+    "````html\n<p>four</p>\n```",
+    "```html\n<pre>```</pre>\n```",
+]
+
+
+def reference_extract(text):
+    files = GeneratedFiles()
+    for file_type, pattern in REFERENCE_PATTERNS.items():
+        matches = re.findall(pattern, text, re.DOTALL | re.IGNORECASE)
+        if matches:
+            setattr(files, file_type, '\n'.join(matches).strip())
+    if not any([files.html, files.jsx, files.tsx]):
+        files.html = text.strip()
+    return files
+
+
+def stream_extract(text, chunk_size):
+    parser = StreamingCodeParser()
+    for start in range(0, len(text), chunk_size):
+        parser.feed(text[start:start + chunk_size])
+    assert parser.getvalue() == text
+    return parser.finalize()
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_extract_files_matches_reference(text):
+    assert asdict(CodeParser.extract_files(text)) == asdict(reference_extract(text))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+@pytest.mark.parametrize("text", SAMPLES)
+def test_streaming_parser_matches_extract_files(text, chunk_size):
+    assert asdict(stream_extract(text, chunk_size)) == asdict(CodeParser.extract_files(text))
+
+
+def test_mid_line_fence_is_extracted():
+    files = stream_extract("Sure! ```html\n<p>x</p>\n```", 4)
+    assert files.html == "<p>x</p>"
+
+
+@pytest.mark.parametrize("text", ["```html \n<p>x</p>\n```", "```html\r\n<p>x</p>\r\n```"])
+def test_non_matching_fences_fall_back_to_raw_text(text):
+    files = stream_extract(text, 4)
+    assert files.html == text.strip()
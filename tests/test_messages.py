@@ -0,0 +1,27 @@
+from app import _DUPLICATE_REPLY_MARKER, _dedupe_messages
+
+
+def test_repeated_user_turns_are_kept():
+    messages = [
+        {'role': 'system', 'content': 'prompt'},
+        {'role': 'user', 'content': 'make it blue'},
+        {'role': 'assistant', 'content': 'first'},
+        {'role': 'user', 'content': 'make it blue'},
+        {'role': 'assistant', 'content': 'second'},
+    ]
+    assert _dedupe_messages(messages) == messages
+
+
+def test_repeated_assistant_content_is_replaced_with_marker():
+    messages = [
+        {'role': 'system', 'content': 'prompt'},
+        {'role': 'user', 'content': 'one'},
+        {'role': 'assistant', 'content': 'same code'},
+        {'role': 'user', 'content': 'two'},
+        {'role': 'assistant', 'content': 'same code'},
+    ]
+    deduped = _dedupe_messages(messages)
+    assert [m['role'] for m in deduped] == [m['role'] for m in messages]
+    assert deduped[2]['content'] == 'same code'
+    assert deduped[4]['content'] == _DUPLICATE_REPLY_MARKER
+    assert messages[4]['content'] == 'same code'